@@ -1,7 +1,8 @@
 """VN News custom component for Home Assistant."""
 import logging
-from .const import DOMAIN
+from .const import DOMAIN, DATA_SNAPSHOTS
 from .utils import init_db
+from .view import VNNewsView
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -11,6 +12,7 @@ async def async_setup(hass, config):
     _LOGGER.info("Khởi tạo VN News component")
     _LOGGER.debug("Bắt đầu thiết lập component VN News")
     init_db()
+    hass.http.register_view(VNNewsView())
 
     # Đăng ký service reload_entry để reload lại từng entry (giống amlich)
     async def reload_entry_service(call):
@@ -45,5 +47,8 @@ async def async_unload_entry(hass, entry):
         if unsub:
             unsub()
         hass.data[DOMAIN].pop(entry.entry_id)
+    # Bỏ snapshot API của nguồn tin thuộc entry này
+    options = entry.options if entry.options else entry.data
+    hass.data.get(DOMAIN, {}).get(DATA_SNAPSHOTS, {}).pop(options.get("news_source", "vnexpress"), None)
     # Unload sensor platform
     return await hass.config_entries.async_forward_entry_unload(entry, "sensor")
@@ -0,0 +1,100 @@
+"""Rút gọn nội dung bài báo trước khi gửi Gemini tóm tắt."""
+import math
+import re
+
+DEFAULT_TOKEN_BUDGET = 400
+# Ước lượng thô cho tiếng Việt: khoảng 3 ký tự một token
+CHARS_PER_TOKEN = 3
+
+# Phần đuôi bài: từ các mốc này trở đi không còn nội dung tin, nếu mốc nằm trong
+# TAIL_PARAGRAPHS đoạn cuối; ở đầu/giữa bài chỉ bỏ đúng dòng chứa mốc
+_TAIL_MARKERS = ("Liên hệ:", "Xem thêm:", ">> Xem thêm", "Mời quý độc giả")
+TAIL_PARAGRAPHS = 3
+_CAPTION_RE = re.compile(
+    r"^(ảnh|video|clip|nguồn|đồ họa)\s*:"
+    r"|\((ảnh|video|nguồn)\s*:[^)]*\)\s*$"
+    r"|[.!?]\s+(Ảnh|Video|Đồ họa)\s*:[^.]*$",
+    re.IGNORECASE
+)
+_BYLINE_RE = re.compile(r"^([Tt]heo\s+\S.*|[A-ZÀ-Ỹ][\wÀ-ỹ]*(\s+[A-ZÀ-Ỹ][\wÀ-ỹ]*){0,4}(\s*[-–]\s*\S.*)?)$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+(?=[A-ZÀ-Ỹ0-9\"“])")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "và của là có được cho với các những một này đã đang sẽ không trong khi để từ theo về người "
+    "thì mà như cũng tại do nên lại ra vào rất nhiều hơn năm ngày tháng ông bà anh chị biết".split()
+)
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def strip_boilerplate(text):
+    """Bỏ chú thích ảnh, byline, dòng nguồn và phần đuôi "Liên hệ:"."""
+    lines = [line.strip() for line in text.split("\n")]
+    lines = [line for line in lines if line]
+    tail_start = len(lines) - TAIL_PARAGRAPHS
+    kept = []
+    for i, line in enumerate(lines):
+        marker = next((m for m in _TAIL_MARKERS if m in line), None)
+        if marker is None:
+            kept.append(line)
+        elif i >= tail_start and kept:
+            # Cắt phần đuôi (chỉ khi đã có nội dung phía trước): giữ phần trước mốc, bỏ mọi dòng sau
+            head = line.split(marker)[0].strip()
+            if head:
+                kept.append(head)
+            break
+    lines = [line for line in kept if not _CAPTION_RE.search(line)]
+    # Byline/nguồn thường là dòng ngắn, không có dấu câu ở cuối bài
+    while lines and len(lines[-1].split()) <= 6 and not lines[-1].endswith((".", "!", "?")) \
+            and _BYLINE_RE.match(lines[-1]):
+        lines.pop()
+    return "\n".join(lines)
+
+
+def _split_sentences(paragraph):
+    return [s.strip() for s in _SENTENCE_RE.split(paragraph) if s.strip()]
+
+
+def compact_content(text, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Giữ đoạn mở đầu và các câu nhiều thông tin nhất trong giới hạn token_budget.
+
+    Trả về (nội dung rút gọn, số token trước, số token sau).
+    """
+    tokens_before = estimate_tokens(text)
+    text = strip_boilerplate(text)
+    if estimate_tokens(text) <= token_budget:
+        return text, tokens_before, estimate_tokens(text)
+
+    paragraphs = text.split("\n")
+    lead = paragraphs[0]
+    if estimate_tokens(lead) > token_budget:
+        lead = lead[:token_budget * CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+        return lead, tokens_before, estimate_tokens(lead)
+
+    sentences = [s for p in paragraphs[1:] for s in _split_sentences(p)]
+    words = [[w for w in _WORD_RE.findall(s.lower()) if w not in _STOPWORDS] for s in sentences]
+    freq = {}
+    for sentence_words in words:
+        for w in set(sentence_words):
+            freq[w] = freq.get(w, 0) + 1
+
+    def score(i):
+        # Từ lặp lại trong bài và con số mang nhiều thông tin; câu sớm được ưu tiên nhẹ
+        sentence_words = words[i]
+        if not sentence_words:
+            return 0
+        value = sum(freq[w] for w in set(sentence_words)) / math.sqrt(len(sentence_words))
+        value += sum(1 for w in sentence_words if w.isdigit())
+        return value / (1 + i / len(sentences))
+
+    budget = token_budget - estimate_tokens(lead)
+    chosen = []
+    for i in sorted(range(len(sentences)), key=score, reverse=True):
+        cost = estimate_tokens(sentences[i]) + 1
+        if cost <= budget:
+            chosen.append(i)
+            budget -= cost
+    compacted = "\n".join([lead] + [sentences[i] for i in sorted(chosen)])
+    return compacted, tokens_before, estimate_tokens(compacted)
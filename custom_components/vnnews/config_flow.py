@@ -2,8 +2,9 @@ import voluptuous as vol
 import logging
 from homeassistant import config_entries
 from homeassistant.helpers import selector
-from .const import DOMAIN
+from .const import DOMAIN, NEWS_FEEDS, DEFAULT_NEWS_FEEDS
 from .utils import set_gemini_api_key, get_gemini_api_key
+from .compact import DEFAULT_TOKEN_BUDGET
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -11,13 +12,26 @@ CONF_GEMINI_API_KEY = "gemini_api_key"
 CONF_NEWS_SOURCE = "news_source"
 CONF_SCAN_INTERVAL = "scan_interval"
 CONF_NEWS_ITEM_COUNT = "news_item_count"
+CONF_NEWS_FEEDS = "news_feeds"
+CONF_TOKEN_BUDGET = "token_budget"
 
 NEWS_SOURCES = {
     "vnexpress": "VNExpress",
-    "24h": "24h.com.vn"
+    "24h": "24h.com.vn",
+    "tonghop": "Tổng hợp nhiều báo"
 }
 
 
+def _feeds_selector():
+    return selector.SelectSelector(
+        selector.SelectSelectorConfig(
+            options=[{"value": k, "label": v["name"]} for k, v in NEWS_FEEDS.items()],
+            multiple=True,
+            mode=selector.SelectSelectorMode.DROPDOWN
+        )
+    )
+
+
 class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
@@ -32,9 +46,11 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             api_key = user_input.get(CONF_GEMINI_API_KEY, "").strip()
             news_source = user_input.get(CONF_NEWS_SOURCE, "vnexpress")
+            news_feeds = user_input.get(CONF_NEWS_FEEDS) or DEFAULT_NEWS_FEEDS.get(news_source, [])
             try:
                 scan_interval = int(user_input.get(CONF_SCAN_INTERVAL, 600))
                 news_item_count = int(user_input.get(CONF_NEWS_ITEM_COUNT, 10))
+                token_budget = int(user_input.get(CONF_TOKEN_BUDGET, DEFAULT_TOKEN_BUDGET))
             except (ValueError, TypeError) as e:
                 _LOGGER.error(f"Invalid input types: {e}")
                 errors["base"] = "invalid_input"
@@ -44,10 +60,14 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     errors[CONF_GEMINI_API_KEY] = "invalid_key"
                 elif news_source not in NEWS_SOURCES:
                     errors[CONF_NEWS_SOURCE] = "invalid_source"
+                elif not news_feeds or any(f not in NEWS_FEEDS for f in news_feeds):
+                    errors[CONF_NEWS_FEEDS] = "invalid_feeds"
                 elif not (1 <= news_item_count <= 30):
                     errors[CONF_NEWS_ITEM_COUNT] = "invalid_count"
                 elif not (1 <= scan_interval <= 600):
                     errors[CONF_SCAN_INTERVAL] = "invalid_interval"
+                elif not (100 <= token_budget <= 4000):
+                    errors[CONF_TOKEN_BUDGET] = "invalid_budget"
                 else:
                     # Check for duplicate configurations
                     unique_id = f"vn_news_{news_source}"
@@ -57,8 +77,10 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     self._pending_data = {
                         CONF_GEMINI_API_KEY: api_key,
                         CONF_NEWS_SOURCE: news_source,
+                        CONF_NEWS_FEEDS: list(news_feeds),
                         CONF_SCAN_INTERVAL: scan_interval,
-                        CONF_NEWS_ITEM_COUNT: news_item_count
+                        CONF_NEWS_ITEM_COUNT: news_item_count,
+                        CONF_TOKEN_BUDGET: token_budget
                     }
                     _LOGGER.debug(f"Pending data: {self._pending_data}")
                     return await self.async_step_confirm()
@@ -73,6 +95,7 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     mode=selector.SelectSelectorMode.DROPDOWN
                 )
             ),
+            vol.Optional(CONF_NEWS_FEEDS): _feeds_selector(),
             vol.Required(CONF_SCAN_INTERVAL, default=600): selector.NumberSelector(
                 selector.NumberSelectorConfig(
                     min=1, max=600, step=1, unit_of_measurement="minutes",
@@ -84,6 +107,12 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     min=1, max=30, step=1, unit_of_measurement="sensors",
                     mode=selector.NumberSelectorMode.BOX
                 )
+            ),
+            vol.Required(CONF_TOKEN_BUDGET, default=DEFAULT_TOKEN_BUDGET): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=100, max=4000, step=50, unit_of_measurement="tokens",
+                    mode=selector.NumberSelectorMode.BOX
+                )
             )
         })
         return self.async_show_form(
@@ -98,8 +127,10 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             return await self.async_step_user()
         api_key = self._pending_data[CONF_GEMINI_API_KEY]
         news_source = self._pending_data[CONF_NEWS_SOURCE]
+        news_feeds = self._pending_data[CONF_NEWS_FEEDS]
         scan_interval = self._pending_data[CONF_SCAN_INTERVAL]
         news_item_count = self._pending_data[CONF_NEWS_ITEM_COUNT]
+        token_budget = self._pending_data[CONF_TOKEN_BUDGET]
         if user_input is not None:
             if user_input.get("confirm"):
                 set_gemini_api_key(api_key)
@@ -108,8 +139,10 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     data={
                         CONF_GEMINI_API_KEY: api_key,
                         CONF_NEWS_SOURCE: news_source,
+                        CONF_NEWS_FEEDS: news_feeds,
                         CONF_SCAN_INTERVAL: scan_interval,
-                        CONF_NEWS_ITEM_COUNT: news_item_count
+                        CONF_NEWS_ITEM_COUNT: news_item_count,
+                        CONF_TOKEN_BUDGET: token_budget
                     }
                 )
             elif user_input.get("back"):
@@ -124,6 +157,7 @@ class VNExpressNewsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             description_placeholders={
                 "api_key_masked": '*' * min(len(api_key), 20) if api_key else '',
                 "news_source": NEWS_SOURCES.get(news_source, news_source),
+                "news_feeds": ", ".join(NEWS_FEEDS[f]["name"] for f in news_feeds),
                 "scan_interval": str(scan_interval),
                 "news_item_count": str(news_item_count)
             }
@@ -148,19 +182,25 @@ class VNExpressNewsOptionsFlowHandler(config_entries.OptionsFlow):
         _LOGGER.debug(f"Options flow input: {user_input}")
         if user_input is not None:
             api_key = user_input.get(CONF_GEMINI_API_KEY, "").strip()
+            news_feeds = user_input.get(CONF_NEWS_FEEDS) or []
             try:
                 scan_interval = int(user_input.get(CONF_SCAN_INTERVAL, 600))
                 news_item_count = int(user_input.get(CONF_NEWS_ITEM_COUNT, 10))
+                token_budget = int(user_input.get(CONF_TOKEN_BUDGET, DEFAULT_TOKEN_BUDGET))
             except (ValueError, TypeError) as e:
                 _LOGGER.error(f"Invalid input types: {e}")
                 errors["base"] = "invalid_input"
             else:
                 if not api_key or len(api_key) < 10:
                     errors[CONF_GEMINI_API_KEY] = "invalid_key"
+                elif not news_feeds or any(f not in NEWS_FEEDS for f in news_feeds):
+                    errors[CONF_NEWS_FEEDS] = "invalid_feeds"
                 elif not (1 <= news_item_count <= 30):
                     errors[CONF_NEWS_ITEM_COUNT] = "invalid_count"
                 elif not (1 <= scan_interval <= 600):
                     errors[CONF_SCAN_INTERVAL] = "invalid_interval"
+                elif not (100 <= token_budget <= 4000):
+                    errors[CONF_TOKEN_BUDGET] = "invalid_budget"
                 else:
                     set_gemini_api_key(api_key)
                     return self.async_create_entry(
@@ -168,15 +208,20 @@ class VNExpressNewsOptionsFlowHandler(config_entries.OptionsFlow):
                         data={
                             CONF_GEMINI_API_KEY: api_key,
                             CONF_NEWS_SOURCE: current.get(CONF_NEWS_SOURCE, "vnexpress"),
+                            CONF_NEWS_FEEDS: list(news_feeds),
                             CONF_SCAN_INTERVAL: scan_interval,
-                            CONF_NEWS_ITEM_COUNT: news_item_count
+                            CONF_NEWS_ITEM_COUNT: news_item_count,
+                            CONF_TOKEN_BUDGET: token_budget
                         }
                     )
         current_api_key = current.get(CONF_GEMINI_API_KEY, get_gemini_api_key() or "")
+        current_source = current.get(CONF_NEWS_SOURCE, "vnexpress")
+        current_feeds = current.get(CONF_NEWS_FEEDS) or DEFAULT_NEWS_FEEDS.get(current_source, [])
         schema = vol.Schema({
             vol.Required(CONF_GEMINI_API_KEY, default=current_api_key): selector.TextSelector(
                 selector.TextSelectorConfig(type=selector.TextSelectorType.PASSWORD)
             ),
+            vol.Required(CONF_NEWS_FEEDS, default=current_feeds): _feeds_selector(),
             vol.Required(CONF_SCAN_INTERVAL, default=current.get(CONF_SCAN_INTERVAL, 600)): selector.NumberSelector(
                 selector.NumberSelectorConfig(
                     min=1, max=600, step=1, unit_of_measurement="minutes",
@@ -188,6 +233,14 @@ class VNExpressNewsOptionsFlowHandler(config_entries.OptionsFlow):
                     min=1, max=30, step=1, unit_of_measurement="sensors",
                     mode=selector.NumberSelectorMode.BOX
                 )
+            ),
+            vol.Required(
+                CONF_TOKEN_BUDGET, default=current.get(CONF_TOKEN_BUDGET, DEFAULT_TOKEN_BUDGET)
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=100, max=4000, step=50, unit_of_measurement="tokens",
+                    mode=selector.NumberSelectorMode.BOX
+                )
             )
         })
         return self.async_show_form(
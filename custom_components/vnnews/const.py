@@ -1,3 +1,73 @@
+from datetime import timedelta, timezone
+
 DOMAIN = "vnnews"
 DB_PATH = "/config/custom_components/vnnews/news.db"
 DEFAULT_NAME = "VN News"
+# Khoá trong hass.data[DOMAIN] chứa snapshot cho HTTP API, theo nguồn tin
+DATA_SNAPSHOTS = "snapshots"
+# Giờ trong DB là giờ địa phương của các báo (pubDate +07:00), lưu không kèm múi giờ
+NEWS_TIMEZONE = timezone(timedelta(hours=7))
+
+# Danh mục feed RSS; "source" là trang báo, quyết định cách bóc tách nội dung bài viết
+NEWS_FEEDS = {
+    "vnexpress_tin_moi_nhat": {
+        "source": "vnexpress", "name": "VNExpress - Tin mới nhất",
+        "url": "https://vnexpress.net/rss/tin-moi-nhat.rss"
+    },
+    "vnexpress_thoi_su": {
+        "source": "vnexpress", "name": "VNExpress - Thời sự",
+        "url": "https://vnexpress.net/rss/thoi-su.rss"
+    },
+    "vnexpress_the_gioi": {
+        "source": "vnexpress", "name": "VNExpress - Thế giới",
+        "url": "https://vnexpress.net/rss/the-gioi.rss"
+    },
+    "vnexpress_kinh_doanh": {
+        "source": "vnexpress", "name": "VNExpress - Kinh doanh",
+        "url": "https://vnexpress.net/rss/kinh-doanh.rss"
+    },
+    "vnexpress_the_thao": {
+        "source": "vnexpress", "name": "VNExpress - Thể thao",
+        "url": "https://vnexpress.net/rss/the-thao.rss"
+    },
+    "vnexpress_phap_luat": {
+        "source": "vnexpress", "name": "VNExpress - Pháp luật",
+        "url": "https://vnexpress.net/rss/phap-luat.rss"
+    },
+    "vnexpress_suc_khoe": {
+        "source": "vnexpress", "name": "VNExpress - Sức khỏe",
+        "url": "https://vnexpress.net/rss/suc-khoe.rss"
+    },
+    "vnexpress_giao_duc": {
+        "source": "vnexpress", "name": "VNExpress - Giáo dục",
+        "url": "https://vnexpress.net/rss/giao-duc.rss"
+    },
+    "24h_tin_tuc_trong_ngay": {
+        "source": "24h", "name": "24h - Tin tức trong ngày",
+        "url": "https://cdn.24h.com.vn/upload/rss/tintuctrongngay.rss"
+    },
+    "24h_bong_da": {
+        "source": "24h", "name": "24h - Bóng đá",
+        "url": "https://cdn.24h.com.vn/upload/rss/bongda.rss"
+    },
+    "24h_the_thao": {
+        "source": "24h", "name": "24h - Thể thao",
+        "url": "https://cdn.24h.com.vn/upload/rss/thethao.rss"
+    },
+    "24h_tai_chinh": {
+        "source": "24h", "name": "24h - Tài chính, bất động sản",
+        "url": "https://cdn.24h.com.vn/upload/rss/taichinhbatdongsan.rss"
+    },
+}
+
+# Feed mặc định cho từng nguồn khi entry chưa chọn feed
+DEFAULT_NEWS_FEEDS = {
+    "vnexpress": ["vnexpress_tin_moi_nhat"],
+    "24h": ["24h_tin_tuc_trong_ngay"],
+    "tonghop": [
+        "vnexpress_thoi_su",
+        "vnexpress_kinh_doanh",
+        "vnexpress_the_thao",
+        "24h_tin_tuc_trong_ngay",
+    ],
+}
@@ -4,28 +4,39 @@ from bs4 import BeautifulSoup
 import time
 import requests
 from datetime import datetime, timedelta
+import html
 import logging
+import re
+from xml.etree import ElementTree
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.event import async_track_time_interval
-from .const import DOMAIN
-from .utils import get_latest_news, add_or_update_news, delete_old_news, get_gemini_api_key, mark_all_old
+from .const import DOMAIN, NEWS_FEEDS, DEFAULT_NEWS_FEEDS
+from .view import get_snapshot, update_snapshot
+from .compact import compact_content, DEFAULT_TOKEN_BUDGET
+from .utils import (
+    NewsRecord, get_latest_news, get_existing_titles, get_retention_cutoff, save_poll, get_gemini_api_key
+)
 import asyncio
 
 CONF_GEMINI_API_KEY = "gemini_api_key"
 CONF_NEWS_SOURCE = "news_source"
 CONF_SCAN_INTERVAL = "scan_interval"
 CONF_NEWS_ITEM_COUNT = "news_item_count"
-
-NEWS_RSS_URLS = {
-    "vnexpress": "https://vnexpress.net/rss/tin-moi-nhat.rss",
-    "24h": "https://cdn.24h.com.vn/upload/rss/tintuctrongngay.rss"
-}
+CONF_NEWS_FEEDS = "news_feeds"
+CONF_TOKEN_BUDGET = "token_budget"
 
 _LOGGER = logging.getLogger(__name__)
 
 MAX_TITLES = 200
+# Số bài viết được tải đồng thời; Gemini vẫn được gọi lần lượt từng bài
+MAX_CONCURRENT_ARTICLES = 5
+# Khoảng cách tối thiểu (giây) giữa hai lần gọi Gemini, tương ứng 15 yêu cầu/phút
+GEMINI_MIN_INTERVAL = 4
+RSS_CHUNK_SIZE = 8192
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+# Tóm tắt lưu thay cho bài Gemini từ chối xử lý, để bài đó không chặn hàng đợi ở mọi lần poll
+GEMINI_FAILED_SUMMARY = "Không thể tóm tắt bài viết này"
 
 
 def summarize_with_gemini(api_key, content, max_length=40):
@@ -46,14 +57,23 @@ def summarize_with_gemini(api_key, content, max_length=40):
             "response_mime_type": "text/plain"
         }
     }
+    # None: lỗi quota/tạm thời (429, 5xx, timeout, sai API key...), nên dừng gọi Gemini ở lần poll này.
+    # GEMINI_FAILED_SUMMARY: lỗi do chính bài này (400, bị chặn, không có candidates), lưu lại và bỏ qua
     try:
         response = requests.post(GEMINI_API_URL, headers=headers, json=data, timeout=30)
-        if response.status_code == 200:
-            return response.json()['candidates'][0]['content']['parts'][0]['text'].strip()
-        else:
-            return f"Lỗi Gemini API: {response.status_code} - {response.text}"
     except Exception as e:
-        return f"Lỗi khi gọi Gemini API: {str(e)}"
+        _LOGGER.error(f"Lỗi khi gọi Gemini API: {str(e)}")
+        return None
+    if response.status_code == 200:
+        try:
+            return response.json()['candidates'][0]['content']['parts'][0]['text'].strip()
+        except (KeyError, IndexError, TypeError, ValueError):
+            _LOGGER.warning(f"Gemini không trả nội dung tóm tắt: {response.text[:500]}")
+            return GEMINI_FAILED_SUMMARY
+    _LOGGER.error(f"Lỗi Gemini API: {response.status_code} - {response.text}")
+    if response.status_code == 400 and "API_KEY" not in response.text:
+        return GEMINI_FAILED_SUMMARY
+    return None
 
 
 async def summarize_content_async(api_key, content, max_length=40):
@@ -126,61 +146,200 @@ async def fetch_full_article(url, published_time=None, session=None, news_source
         }
 
 
-def get_rss_url(news_source):
-    return NEWS_RSS_URLS.get(news_source, NEWS_RSS_URLS["vnexpress"])
+def get_feed_ids(news_source, feeds=None):
+    feed_ids = [f for f in (feeds or []) if f in NEWS_FEEDS]
+    return feed_ids or DEFAULT_NEWS_FEEDS.get(news_source, DEFAULT_NEWS_FEEDS["vnexpress"])
+
+
+def parse_published_time(published_time):
+    if not published_time:
+        return None
+    try:
+        return datetime.strptime(published_time, '%a, %d %b %Y %H:%M:%S %z').strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def clean_title(raw_title):
+    # Title là khoá chống trùng: giải mã entity (kể cả trong CDATA), bỏ thẻ HTML, gộp khoảng trắng
+    title = " ".join(_TAG_RE.sub("", html.unescape(raw_title or "")).split())
+    return title or 'Không tìm thấy tiêu đề'
+
+
+def _rss_item(raw_title, link, published):
+    # raw_title giữ lại để khớp các tin đã lưu trước khi chuẩn hoá title
+    raw_title = (raw_title or '').strip()
+    return {
+        'title': clean_title(raw_title),
+        'raw_title': raw_title,
+        'link': (link or '').strip(),
+        'published': (published or '').strip() or None
+    }
+
+
+def _rss_item_to_dict(item):
+    return _rss_item(item.findtext('title'), item.findtext('link'), item.findtext('pubDate'))
+
 
+async def read_rss_items(response, num_articles=30):
+    """Đọc dần RSS từ response, dừng ngay khi đủ num_articles <item>.
 
-async def fetch_rss_and_update_db(api_key, news_source="vnexpress", num_articles=30):
-    _LOGGER.debug(f"Lấy tin từ RSS ({news_source}) và cập nhật DB")
+    Không tải phần còn lại của feed và không dựng entry cho các item không dùng.
+    Nếu XML lỗi thì quay về feedparser trên toàn bộ nội dung.
+    """
+    parser = ElementTree.XMLPullParser(events=("end",))
+    raw_chunks = []
+    items = []
+    try:
+        async for chunk in response.content.iter_chunked(RSS_CHUNK_SIZE):
+            raw_chunks.append(chunk)
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                if elem.tag != "item":
+                    continue
+                items.append(_rss_item_to_dict(elem))
+                elem.clear()
+                if len(items) >= num_articles:
+                    return items
+        parser.close()
+        return items
+    except ElementTree.ParseError as e:
+        _LOGGER.debug(f"RSS không hợp lệ ({e}), dùng feedparser")
+        raw_chunks.append(await response.read())
+        rss_content = b"".join(raw_chunks)
+
+        def parse_rss_sync():
+            return feedparser.parse(rss_content)
+        parsed = await asyncio.get_event_loop().run_in_executor(None, parse_rss_sync)
+        return [
+            _rss_item(a.get('title'), a.get('link'), a.get('published'))
+            for a in parsed.entries[:num_articles]
+        ]
+
+
+async def fetch_feed_entries(session, feed_id, num_articles=30):
+    feed = NEWS_FEEDS[feed_id]
+    async with session.get(feed["url"], timeout=10) as response:
+        response.raise_for_status()
+        items = await read_rss_items(response, num_articles)
+    return [(feed["source"], item) for item in items]
+
+
+async def fetch_rss_and_update_db(
+    api_key, news_source="vnexpress", num_articles=30, feeds=None, token_budget=DEFAULT_TOKEN_BUDGET
+):
+    feed_ids = get_feed_ids(news_source, feeds)
+    # Giữ đủ chỗ cho mọi tin đang có trong các feed, nếu không tin vừa ghi sẽ bị xoá ngay
+    max_titles = max(MAX_TITLES, len(feed_ids) * num_articles)
+    _LOGGER.debug(f"Lấy tin từ {len(feed_ids)} feed RSS ({news_source}) và cập nhật DB")
     try:
-        rss_url = get_rss_url(news_source)
         async with aiohttp.ClientSession() as session:
-            async with session.get(rss_url, timeout=10) as response:
-                response.raise_for_status()
-                rss_content = await response.text()
-
-            def parse_rss_sync():
-                return feedparser.parse(rss_content)
-            feed = await asyncio.get_event_loop().run_in_executor(None, parse_rss_sync)
-            articles = feed.entries
-            count_new = 0
-            db_news = get_latest_news(500, source=news_source)
-            db_titles = set(n['title'] for n in db_news)
-            mark_all_old(source=news_source)
-            for article in articles[:num_articles]:
-                link = article.get('link', '')
-                published_time = article.get('published', None)
-                if published_time:
-                    try:
-                        published_time = (
-                            datetime.strptime(
-                                published_time,
-                                '%a, %d %b %Y %H:%M:%S %z'
-                            ).strftime('%Y-%m-%d %H:%M:%S')
-                        )
-                    except ValueError:
-                        published_time = None
-                title = article.get('title', 'Không tìm thấy tiêu đề')
-                if title not in db_titles:
-                    full_article = await fetch_full_article(link, published_time, session, news_source=news_source)
-                    if full_article['title'] != 'Lỗi':
-                        summary = (
-                            await summarize_content_async(api_key, full_article['content'])
-                            if full_article['content'] else 'Không có nội dung'
-                        )
-                        new_entry = {
-                            'title': title,
-                            'time': full_article['time'],
-                            'content': full_article['content'],
-                            'summary': summary,
-                            'link': link,
-                            'is_new': 1,
-                            'source': news_source
-                        }
-                        add_or_update_news(new_entry)
-                        count_new += 1
-                        db_titles.add(title)
-            delete_old_news(MAX_TITLES, source=news_source)
+            # Lấy song song mọi feed, feed lỗi không làm hỏng cả lần poll
+            results = await asyncio.gather(
+                *(fetch_feed_entries(session, feed_id, num_articles) for feed_id in feed_ids),
+                return_exceptions=True
+            )
+            if all(isinstance(result, Exception) for result in results):
+                # Không feed nào lấy được (mất mạng...): giữ nguyên DB và cờ "Tin mới"
+                for feed_id, result in zip(feed_ids, results):
+                    _LOGGER.error(f"Lỗi lấy feed RSS {feed_id}: {result}")
+                return 0
+            # Gộp các feed, bỏ trùng theo link (và title) trước khi lấy bài viết
+            candidates = {}
+            titles = set()
+            raw_titles = {}
+            for feed_id, result in zip(feed_ids, results):
+                if isinstance(result, Exception):
+                    _LOGGER.error(f"Lỗi lấy feed RSS {feed_id}: {result}")
+                    continue
+                for article_source, article in result:
+                    link = article['link']
+                    title = article['title']
+                    if not link or link in candidates or title in titles:
+                        continue
+                    titles.add(title)
+                    raw_titles[link] = article['raw_title']
+                    candidates[link] = NewsRecord(
+                        title=title,
+                        time=parse_published_time(article['published']),
+                        link=link,
+                        source=article_source
+                    )
+            # Chỉ tra các title vừa đọc qua index (source, title), không tải lại tin cũ
+            db_titles = get_existing_titles(news_source, titles | set(raw_titles.values()))
+            # Tin cũ hơn mốc lưu trữ sẽ bị xoá ngay sau khi ghi rồi lại bị tóm tắt ở lần poll sau
+            cutoff = get_retention_cutoff(news_source, max_titles)
+            # Xử lý mọi tin mới đang có trong feed (tối đa feed x num_articles): tin bỏ lại sẽ bị đẩy
+            # khỏi feed trước lần poll sau. Hạn mức Gemini do GEMINI_MIN_INTERVAL đảm bảo;
+            # tin mới nhất làm trước để nếu hết quota giữa chừng thì tin cũ hơn chờ lần sau
+            pending = sorted(
+                (
+                    c for c in candidates.values()
+                    if c.title not in db_titles and raw_titles[c.link] not in db_titles and not (cutoff and c.time and c.time <= cutoff)
+                ),
+                key=lambda c: c.time or '',
+                reverse=True
+            )
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_ARTICLES)
+            gemini_lock = asyncio.Lock()
+            gemini_state = {"failed": False, "last_call": None}
+            loop = asyncio.get_event_loop()
+
+            async def summarize_limited(content):
+                # Gọi Gemini lần lượt, giãn cách theo hạn mức; lỗi quota/tạm thời đầu tiên (vd. 429)
+                # dừng cả lần poll, còn lỗi riêng của một bài chỉ cho ra GEMINI_FAILED_SUMMARY
+                async with gemini_lock:
+                    if gemini_state["failed"]:
+                        return None
+                    if gemini_state["last_call"] is not None:
+                        wait = GEMINI_MIN_INTERVAL - (loop.time() - gemini_state["last_call"])
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                    gemini_state["last_call"] = loop.time()
+                    summary = await summarize_content_async(api_key, content)
+                    if summary is None:
+                        gemini_state["failed"] = True
+                    return summary
+
+            async def process_article(candidate):
+                async with semaphore:
+                    full_article = await fetch_full_article(
+                        candidate.link, candidate.time, session, news_source=candidate.source
+                    )
+                if full_article['title'] == 'Lỗi':
+                    return None
+                # Chỉ gửi Gemini phần mở đầu + các câu nhiều thông tin nhất, trong giới hạn token
+                prompt_content, tokens_before, tokens_after = compact_content(
+                    full_article['content'], token_budget
+                )
+                _LOGGER.debug(f"Rút gọn nội dung {candidate.link}: {tokens_before} -> {tokens_after} token")
+                summary = await summarize_limited(prompt_content) if prompt_content else 'Không có nội dung'
+                if summary is None:
+                    # Lỗi quota/tạm thời: không lưu để lần poll sau thử lại
+                    return None
+                return NewsRecord(
+                    title=candidate.title,
+                    time=full_article['time'],
+                    content=full_article['content'],
+                    summary=summary,
+                    link=candidate.link,
+                    source=news_source,
+                    tokens_before=tokens_before,
+                    tokens_after=tokens_after
+                )
+            processed = await asyncio.gather(*(process_article(c) for c in pending))
+            new_entries = [entry for entry in processed if entry]
+            if new_entries:
+                _LOGGER.info(
+                    f"Nội dung gửi Gemini: {sum(e.tokens_before for e in new_entries)} -> "
+                    f"{sum(e.tokens_after for e in new_entries)} token ước lượng"
+                )
+            # Một transaction cho cả lần poll: tăng thế hệ, upsert tin mới, xoá tin cũ
+            save_poll(news_source, new_entries, max_titles)
+            count_new = len(new_entries)
             _LOGGER.info(f"Đã cập nhật {count_new} tin mới vào DB")
             return count_new
     except Exception as e:
@@ -194,18 +353,20 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     news_source = options.get(CONF_NEWS_SOURCE, "vnexpress")
     scan_interval = int(options.get(CONF_SCAN_INTERVAL, 600))
     news_item_count = int(options.get(CONF_NEWS_ITEM_COUNT, 10))
+    news_feeds = get_feed_ids(news_source, options.get(CONF_NEWS_FEEDS))
+    token_budget = int(options.get(CONF_TOKEN_BUDGET, DEFAULT_TOKEN_BUDGET))
     if not api_key:
         _LOGGER.error("Chưa cấu hình Gemini API Key!")
         return
     hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = {
         CONF_NEWS_ITEM_COUNT: news_item_count
     }
-    sensor = VNExpressNewsSensor(api_key, news_source)
+    sensor = VNExpressNewsSensor(api_key, news_source, news_feeds, token_budget)
     sensors = [sensor]
     for i in range(1, news_item_count + 1):
         sensors.append(NewsItemSensor(news_source, i))
     async_add_entities(sensors)
-    _LOGGER.debug(f"Added {len(sensors)} sensors for news_source: {news_source}")
+    _LOGGER.debug(f"Added {len(sensors)} sensors for news_source: {news_source} ({len(news_feeds)} feeds)")
 
     # Tạo polling riêng cho entry này
     async def _entry_update(now=None):
@@ -223,9 +384,11 @@ class VNExpressNewsSensor(SensorEntity, RestoreEntity):
     _attr_should_poll = False
     entity_registry_enabled_default = True
 
-    def __init__(self, api_key, news_source):
+    def __init__(self, api_key, news_source, news_feeds=None, token_budget=DEFAULT_TOKEN_BUDGET):
         self._api_key = api_key
         self._news_source = news_source
+        self._news_feeds = news_feeds
+        self._token_budget = token_budget
         self._state = "Không có tin mới"
         self._attr_name = f"{news_source.upper()} News"
         self._attr_unique_id = f"vn_news_sensor_{news_source}"
@@ -249,26 +412,34 @@ class VNExpressNewsSensor(SensorEntity, RestoreEntity):
 
     async def async_update(self):
         _LOGGER.info(f"Cập nhật sensor News ({self._news_source}) (sqlite)")
-        count_new = await fetch_rss_and_update_db(self._api_key, self._news_source)
+        count_new = await fetch_rss_and_update_db(
+            self._api_key, self._news_source, feeds=self._news_feeds, token_budget=self._token_budget
+        )
         self._new_count = count_new
         self._last_update = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         news_list = get_latest_news(30, source=self._news_source)
         news_list = sorted(
             news_list,
             key=lambda x: (
-                0 if x.get('is_new', False) else 1,
-                -datetime.strptime(x['time'], '%Y-%m-%d %H:%M:%S').timestamp()
+                0 if x.is_new else 1,
+                -datetime.strptime(x.time, '%Y-%m-%d %H:%M:%S').timestamp()
             )
         )
         attributes = {}
         for i, news in enumerate(news_list, 1):
             padded_index = f"{i:02d}"
-            key = f"Tin {padded_index} (Tin mới)" if news.get('is_new', False) else f"Tin {padded_index}"
-            attributes[key] = f"Tiêu Đề: {news['title']}\nNội Dung: {news['summary']}"
+            key = f"Tin {padded_index} (Tin mới)" if news.is_new else f"Tin {padded_index}"
+            attributes[key] = f"Tiêu Đề: {news.title}\nNội Dung: {news.summary}"
         attributes["tin_moi"] = self._new_count
         attributes["cap_nhat_luc"] = self._last_update
         attributes["nguon_tin"] = self._news_source
+        attributes["so_feed"] = len(get_feed_ids(self._news_source, self._news_feeds))
         self._attributes = attributes
+        # Snapshot cho HTTP API chỉ dựng lại khi lần poll làm dữ liệu thay đổi
+        if self._hass:
+            snapshot = get_snapshot(self._hass, self._news_source)
+            if snapshot is None or count_new > 0 or snapshot.has_new:
+                update_snapshot(self._hass, self._news_source, get_latest_news(MAX_TITLES, source=self._news_source))
         self._state = f"Có {count_new} tin mới" if count_new > 0 else "Không có tin mới"
 
         if self._hass and self._entry_id:
@@ -323,16 +494,16 @@ class NewsItemSensor(SensorEntity):
     async def async_update(self):
         # Lấy tất cả tin từ DB, ưu tiên is_new==1, thiếu thì lấy tin cũ, tất cả theo time mới nhất
         all_news = get_latest_news(60, source=self._news_source)
-        news_moi = [n for n in all_news if n.get('is_new', 0) == 1]
-        news_cu = [n for n in all_news if n.get('is_new', 0) != 1]
-        news_moi = sorted(news_moi, key=lambda x: -datetime.strptime(x['time'], '%Y-%m-%d %H:%M:%S').timestamp())
-        news_cu = sorted(news_cu, key=lambda x: -datetime.strptime(x['time'], '%Y-%m-%d %H:%M:%S').timestamp())
+        news_moi = [n for n in all_news if n.is_new]
+        news_cu = [n for n in all_news if not n.is_new]
+        news_moi = sorted(news_moi, key=lambda x: -datetime.strptime(x.time, '%Y-%m-%d %H:%M:%S').timestamp())
+        news_cu = sorted(news_cu, key=lambda x: -datetime.strptime(x.time, '%Y-%m-%d %H:%M:%S').timestamp())
         news_list = news_moi + news_cu
         if len(news_list) >= self._index:
-            summary = news_list[self._index - 1]['summary']
+            summary = news_list[self._index - 1].summary
             self._state = summary[:255] if summary else ""
         else:
-            summary = news_list[-1]['summary'] if news_list else ""
+            summary = news_list[-1].summary if news_list else ""
             self._state = summary[:255] if summary else "Không có dữ liệu"
 
     @property
@@ -351,6 +522,8 @@ class NewsItemSensor(SensorEntity):
             source_label = "VNExpress"
         elif source_label == "24h":
             source_label = "24h.com.vn"
+        elif source_label == "tonghop":
+            source_label = "Tổng hợp"
         return {
             "identifiers": {(DOMAIN, f"vn_news_{self._news_source}")},
             "name": f"VN News ({source_label})",
@@ -1,8 +1,26 @@
 import sqlite3
 import os
+from dataclasses import dataclass
 from datetime import datetime
 from .const import DB_PATH
 
+# Giới hạn số tham số trong một câu IN (...) để không vượt SQLITE_MAX_VARIABLE_NUMBER
+_IN_CHUNK_SIZE = 500
+
+
+@dataclass(slots=True)
+class NewsRecord:
+    """Một tin trong pipeline RSS -> tóm tắt -> DB -> sensor."""
+    title: str
+    time: str
+    summary: str = None
+    link: str = None
+    content: str = None
+    source: str = None
+    is_new: bool = False
+    tokens_before: int = None
+    tokens_after: int = None
+
 
 def init_db():
     db_dir = os.path.dirname(DB_PATH)
@@ -10,6 +28,8 @@ def init_db():
         os.makedirs(db_dir, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    # WAL: mỗi lần poll chỉ một commit, sensor đọc không bị chặn khi đang ghi
+    cursor.execute('PRAGMA journal_mode=WAL')
     # Thêm cột source nếu chưa có
     cursor.execute('''CREATE TABLE IF NOT EXISTS news (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -19,12 +39,45 @@ def init_db():
         summary TEXT,
         link TEXT,
         is_new INTEGER DEFAULT 1,
-        source TEXT
+        source TEXT,
+        generation INTEGER DEFAULT 0,
+        tokens_before INTEGER,
+        tokens_after INTEGER
     )''')
     try:
         cursor.execute('ALTER TABLE news ADD COLUMN source TEXT')
     except Exception:
         pass
+    # Mỗi lần poll của một nguồn là một "thế hệ"; tin mới = tin thuộc thế hệ mới nhất
+    cursor.execute('''CREATE TABLE IF NOT EXISTS poll_generation (
+        source TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL DEFAULT 0
+    )''')
+    try:
+        cursor.execute('ALTER TABLE news ADD COLUMN generation INTEGER DEFAULT 0')
+    except Exception:
+        pass
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_news_source_title'"
+    )
+    if cursor.fetchone() is None:
+        # DB cũ (hoặc lần migrate trước bị ngắt giữa chừng): chuyển is_new sang thế hệ 1
+        # và bỏ bản ghi trùng trước khi tạo unique index, tất cả trong cùng transaction
+        cursor.execute('UPDATE news SET generation=is_new')
+        cursor.execute(
+            '''INSERT OR IGNORE INTO poll_generation (source, generation)
+               SELECT DISTINCT source, 1 FROM news WHERE source IS NOT NULL'''
+        )
+        cursor.execute('''DELETE FROM news WHERE id NOT IN (
+            SELECT MAX(id) FROM news GROUP BY source, title
+        )''')
+    # Kích thước nội dung (token ước lượng) trước/sau khi rút gọn để gửi Gemini
+    for column in ('tokens_before', 'tokens_after'):
+        try:
+            cursor.execute(f'ALTER TABLE news ADD COLUMN {column} INTEGER')
+        except Exception:
+            pass
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_news_source_title ON news (source, title)')
     cursor.execute('''CREATE TABLE IF NOT EXISTS config (
         id INTEGER PRIMARY KEY,
         gemini_api_key TEXT,
@@ -34,94 +87,129 @@ def init_db():
     conn.close()
 
 
-def add_or_update_news(news):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    # Kiểm tra đã có tin cùng title và source chưa
-    cursor.execute('''SELECT id FROM news WHERE title=? AND source=?''', (news['title'], news['source']))
-    row = cursor.fetchone()
-    if row:
-        cursor.execute(
-            '''UPDATE news SET time=?, content=?, summary=?, link=?, is_new=? WHERE id=?''',
-            (
-                news['time'],
-                news['content'],
-                news['summary'],
-                news['link'],
-                int(news.get('is_new', 1)),
-                row[0]
-            )
-        )
+def _next_generation(cursor, source):
+    cursor.execute(
+        '''INSERT INTO poll_generation (source, generation) VALUES (?, 1)
+           ON CONFLICT(source) DO UPDATE SET generation=generation + 1''',
+        (source,)
+    )
+    cursor.execute('SELECT generation FROM poll_generation WHERE source=?', (source,))
+    return cursor.fetchone()[0]
+
+
+def _prune_news(cursor, max_titles, source=None):
+    if source:
+        cursor.execute('''DELETE FROM news WHERE id NOT IN (
+            SELECT id FROM news WHERE source=? ORDER BY datetime(time) DESC LIMIT ?
+        ) AND source=?''', (source, max_titles, source))
     else:
-        cursor.execute(
-            '''INSERT INTO news (title, time, content, summary, link, is_new, source)
-            VALUES (?, ?, ?, ?, ?, ?, ?)''',
-            (
-                news['title'],
-                news['time'],
-                news['content'],
-                news['summary'],
-                news['link'],
-                int(news.get('is_new', 1)),
-                news['source']
+        cursor.execute('''DELETE FROM news WHERE id NOT IN (
+            SELECT id FROM news ORDER BY datetime(time) DESC LIMIT ?
+        )''', (max_titles,))
+
+
+def save_poll(source, news_list, max_titles=200):
+    """Ghi kết quả một lần poll trong một transaction duy nhất.
+
+    Tăng thế hệ của nguồn, upsert toàn bộ tin mới theo (source, title) rồi
+    xoá tin cũ vượt quá max_titles. Không cần UPDATE đánh dấu tin cũ.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            cursor = conn.cursor()
+            generation = _next_generation(cursor, source)
+            cursor.executemany(
+                '''INSERT INTO news (title, time, content, summary, link, source, generation,
+                                   tokens_before, tokens_after)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(source, title) DO UPDATE SET
+                       time=excluded.time,
+                       content=excluded.content,
+                       summary=excluded.summary,
+                       link=excluded.link,
+                       generation=excluded.generation,
+                       tokens_before=excluded.tokens_before,
+                       tokens_after=excluded.tokens_after''',
+                [
+                    (
+                        news.title, news.time, news.content, news.summary, news.link, source, generation,
+                        news.tokens_before, news.tokens_after
+                    )
+                    for news in news_list
+                ]
             )
-        )
-    conn.commit()
-    conn.close()
+            _prune_news(cursor, max_titles, source=source)
+    finally:
+        conn.close()
+    return generation
 
 
 def get_latest_news(limit=30, source=None):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    # is_new được suy ra từ thế hệ poll mới nhất của nguồn
+    query = '''SELECT n.title, n.time, n.summary, n.link,
+                      COALESCE(n.generation = g.generation, 0)
+               FROM news n
+               LEFT JOIN poll_generation g ON g.source = n.source'''
     if source:
         cursor.execute(
-            '''SELECT title, time, summary, link, is_new
-               FROM news
-               WHERE source=?
-               ORDER BY datetime(time) DESC
+            query + '''
+               WHERE n.source=?
+               ORDER BY datetime(n.time) DESC
                LIMIT ?''',
             (source, limit)
         )
     else:
         cursor.execute(
-            '''SELECT title, time, summary, link, is_new
-               FROM news
-               ORDER BY datetime(time) DESC
+            query + '''
+               ORDER BY datetime(n.time) DESC
                LIMIT ?''',
             (limit,)
         )
     rows = cursor.fetchall()
     conn.close()
     return [
-        {'title': r[0], 'time': r[1], 'summary': r[2], 'link': r[3], 'is_new': bool(r[4])}
+        NewsRecord(title=r[0], time=r[1], summary=r[2], link=r[3], source=source, is_new=bool(r[4]))
         for r in rows
     ]
 
 
-def mark_all_old(source=None):
+def get_retention_cutoff(source, max_titles):
+    """Thời gian của tin cũ nhất còn được giữ khi nguồn đã đủ max_titles tin, ngược lại None.
+
+    Tin không mới hơn mốc này sẽ bị xoá ngay trong lần poll ghi nó vào.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    if source:
-        cursor.execute('UPDATE news SET is_new=0 WHERE source=?', (source,))
-    else:
-        cursor.execute('UPDATE news SET is_new=0')
-    conn.commit()
+    cursor.execute(
+        '''SELECT time FROM news WHERE source=?
+           ORDER BY datetime(time) DESC LIMIT 1 OFFSET ?''',
+        (source, max_titles - 1)
+    )
+    row = cursor.fetchone()
     conn.close()
+    return row[0] if row else None
 
 
-def delete_old_news(max_titles=200, source=None):
+def get_existing_titles(source, titles):
+    """Trả về các title trong `titles` đã có trong DB của nguồn, tra qua unique index (source, title)."""
+    titles = list(titles)
+    existing = set()
+    if not titles:
+        return existing
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    if source:
-        cursor.execute('''DELETE FROM news WHERE id NOT IN (
-            SELECT id FROM news WHERE source=? ORDER BY datetime(time) DESC LIMIT ?
-        ) AND source=?''', (source, max_titles, source))
-    else:
-        cursor.execute('''DELETE FROM news WHERE id NOT IN (
-            SELECT id FROM news ORDER BY datetime(time) DESC LIMIT ?
-        )''', (max_titles,))
-    conn.commit()
+    for i in range(0, len(titles), _IN_CHUNK_SIZE):
+        chunk = titles[i:i + _IN_CHUNK_SIZE]
+        cursor.execute(
+            f'''SELECT title FROM news WHERE source=? AND title IN ({",".join("?" * len(chunk))})''',
+            (source, *chunk)
+        )
+        existing.update(r[0] for r in cursor.fetchall())
     conn.close()
+    return existing
 
 
 def set_gemini_api_key(api_key):
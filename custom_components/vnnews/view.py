@@ -0,0 +1,161 @@
+"""HTTP API trả tin đã tóm tắt dạng JSON: /api/vnnews/<source>."""
+import gzip
+import hashlib
+import json
+import logging
+from datetime import datetime
+from http import HTTPStatus
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from .const import DOMAIN, DATA_SNAPSHOTS, NEWS_TIMEZONE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Số biến thể (limit, since, gzip) được cache cho mỗi snapshot
+MAX_CACHED_VARIANTS = 32
+GZIP_MIN_SIZE = 512
+
+
+class NewsSnapshot:
+    """Ảnh chụp tin của một nguồn sau lần poll gần nhất, kèm body JSON dựng sẵn."""
+    __slots__ = ("source", "items", "etag", "has_new", "_variants")
+
+    def __init__(self, source, records):
+        self.source = source
+        self.items = [
+            {
+                "title": r.title,
+                "time": r.time,
+                "summary": r.summary,
+                "link": r.link,
+                "is_new": r.is_new
+            }
+            for r in records
+        ]
+        self.has_new = any(r.is_new for r in records)
+        body = json.dumps({"source": source, "items": self.items}, ensure_ascii=False).encode("utf-8")
+        self.etag = hashlib.sha1(body).hexdigest()[:16]
+        self._variants = {(None, None, False): body}
+
+    def variant_etag(self, limit, since, use_gzip):
+        # Mỗi biểu diễn (tham số + content coding) có ETag mạnh riêng
+        # ETag không được chứa dấu cách: since dạng "YYYY-MM-DD HH:MM:SS" ghi lại với "T"
+        tag = self.etag if limit is None and since is None else f"{self.etag}-{limit}-{(since or '').replace(' ', 'T')}"
+        return f'"{tag}-gz"' if use_gzip else f'"{tag}"'
+
+    def body(self, limit, since, use_gzip):
+        key = (limit, since, use_gzip)
+        cached = self._variants.get(key)
+        if cached is not None:
+            return cached
+        if use_gzip:
+            plain = self.body(limit, since, False)
+            result = gzip.compress(plain, compresslevel=6) if len(plain) >= GZIP_MIN_SIZE else plain
+        else:
+            items = self.items
+            if since:
+                items = [i for i in items if i["time"] and i["time"] > since]
+            if limit is not None:
+                items = items[:limit]
+            result = json.dumps({"source": self.source, "items": items}, ensure_ascii=False).encode("utf-8")
+        if len(self._variants) >= MAX_CACHED_VARIANTS:
+            self._variants.clear()
+        self._variants[key] = result
+        return result
+
+
+def get_snapshot(hass, source):
+    return hass.data.get(DOMAIN, {}).get(DATA_SNAPSHOTS, {}).get(source)
+
+
+def update_snapshot(hass, source, records):
+    """Dựng lại snapshot của nguồn; giữ snapshot cũ nếu nội dung không đổi để ETag ổn định."""
+    snapshot = NewsSnapshot(source, records)
+    snapshots = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SNAPSHOTS, {})
+    old = snapshots.get(source)
+    if old is not None and old.etag == snapshot.etag:
+        return old
+    snapshots[source] = snapshot
+    _LOGGER.debug(f"Đã dựng lại snapshot API cho {source}: {len(snapshot.items)} tin")
+    return snapshot
+
+
+def _parse_since(value):
+    # ISO 8601 ("T" hoặc dấu cách, có thể kèm múi giờ); giờ có múi giờ được đổi về giờ lưu trong DB.
+    # Sai định dạng -> ValueError (400)
+    if not value:
+        return None
+    since = datetime.fromisoformat(value.strip())
+    if since.tzinfo is not None:
+        since = since.astimezone(NEWS_TIMEZONE).replace(tzinfo=None)
+    return since.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _accepts_gzip(accept_encoding):
+    # Accept-Encoding có q-value: "gzip;q=0" là từ chối; "*" áp dụng khi không nêu gzip
+    accepted = None
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        coding = coding.lower()
+        if coding not in ("gzip", "x-gzip", "*"):
+            continue
+        q = 1.0
+        for param in params:
+            name, _, val = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            if accepted is None:
+                accepted = q > 0
+        else:
+            return q > 0
+    return bool(accepted)
+
+
+def _etag_matches(if_none_match, etag):
+    # If-None-Match là danh sách cách nhau bởi dấu phẩy, so sánh yếu (bỏ tiền tố W/), hoặc "*"
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class VNNewsView(HomeAssistantView):
+    """Trả tin của một nguồn từ snapshot trong bộ nhớ, không đụng SQLite hay state machine."""
+
+    url = "/api/vnnews/{source}"
+    name = "api:vnnews"
+    requires_auth = True
+
+    async def get(self, request, source):
+        snapshot = get_snapshot(request.app["hass"], source)
+        if snapshot is None:
+            return self.json_message(f"Không có dữ liệu cho nguồn {source}", HTTPStatus.NOT_FOUND)
+        try:
+            limit = request.query.get("limit")
+            limit = int(limit) if limit else None
+            if limit is not None and limit < 1:
+                raise ValueError(limit)
+            since = _parse_since(request.query.get("since"))
+        except ValueError:
+            return self.json_message("Tham số limit/since không hợp lệ", HTTPStatus.BAD_REQUEST)
+
+        use_gzip = _accepts_gzip(request.headers.get("Accept-Encoding", ""))
+        body = snapshot.body(limit, since, use_gzip)
+        # Body nhỏ không được nén: trả bản gốc với ETag của bản gốc
+        use_gzip = use_gzip and body[:2] == b"\x1f\x8b"
+        etag = snapshot.variant_etag(limit, since, use_gzip)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("If-None-Match", ""), etag):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
@@ -0,0 +1,60 @@
+"""So sánh số token đầu vào và độ trễ Gemini khi gửi nguyên bài và khi rút gọn bằng compact.
+
+Gemini được thay bằng fakes.FakeGemini (độ trễ tỉ lệ với số token đầu vào), bài báo
+sinh bởi fakes.make_article_text (có chú thích ảnh, byline, phần "Liên hệ:").
+
+    python scripts/bench_compaction.py --articles 30 --budget 400
+"""
+import argparse
+import os
+import statistics
+import time
+
+import requests
+
+import fakes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tree", default=os.path.join(os.path.dirname(__file__), ".."),
+                        help="thư mục gốc repo chứa custom_components/vnnews")
+    parser.add_argument("--articles", type=int, default=30)
+    parser.add_argument("--budget", type=int, default=400, help="token_budget truyền cho compact_content")
+    parser.add_argument("--base-latency", type=float, default=0.3, help="độ trễ cố định mỗi lần gọi (giây)")
+    parser.add_argument("--per-token-latency", type=float, default=0.00025, help="độ trễ mỗi token đầu vào (giây)")
+    args = parser.parse_args()
+
+    sensor, _ = fakes.load_component(args.tree)
+    from custom_components.vnnews.compact import compact_content
+
+    articles = ["\n".join(fakes.make_article_text(seed)) for seed in range(args.articles)]
+    results = {}
+    for mode in ("nguyên bài", "rút gọn"):
+        gemini = fakes.FakeGemini(args.base_latency, args.per_token_latency)
+        requests.post = gemini.post
+        latencies = []
+        compaction = []
+        for text in articles:
+            started = time.perf_counter()
+            if mode == "rút gọn":
+                text, _, _ = compact_content(text, args.budget)
+                compaction.append(time.perf_counter() - started)
+            summary = sensor.summarize_with_gemini("fake-key", text)
+            assert summary, "FakeGemini không trả tóm tắt"
+            latencies.append(time.perf_counter() - started)
+        results[mode] = (gemini.input_tokens, latencies, compaction)
+
+    print(f"{args.articles} bài, token_budget={args.budget}")
+    for mode, (tokens, latencies, compaction) in results.items():
+        line = (f"{mode:<10} token đầu vào {tokens:>7}  độ trễ trung bình {statistics.mean(latencies) * 1000:>6.0f} ms"
+                f"  tổng {sum(latencies):>6.1f} s")
+        if compaction:
+            line += f"  (rút gọn: trung vị {statistics.median(compaction) * 1000:.1f} ms)"
+        print(line)
+    full, short = results["nguyên bài"][0], results["rút gọn"][0]
+    print(f"giảm {100 * (1 - short / full):.0f}% token đầu vào")
+
+
+if __name__ == "__main__":
+    main()
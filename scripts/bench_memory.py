@@ -0,0 +1,64 @@
+"""Đo đỉnh bộ nhớ (tracemalloc) của một lần poll fetch_rss_and_update_db cho từng nguồn.
+
+Mạng và Gemini được thay bằng scripts/fakes.py; cần cài homeassistant, aiohttp,
+feedparser, beautifulsoup4 và requests như khi chạy trong Home Assistant.
+
+    python scripts/bench_memory.py                 # cây hiện tại
+    git worktree add /tmp/vnnews-base <commit>
+    python scripts/bench_memory.py --tree /tmp/vnnews-base   # để so sánh trước/sau
+
+Mỗi nguồn chạy trên DB trống và poll lặp lại cho tới khi không còn tin mới:
+poll đầu là lúc nạp tin, poll cuối là lần quét lại thường gặp khi không có tin mới.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+import aiohttp
+import requests
+
+import fakes
+
+SOURCES = ("vnexpress", "24h", "tonghop")
+MAX_POLLS = 12
+
+
+def measure_poll(sensor, source):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count_new = asyncio.run(sensor.fetch_rss_and_update_db("fake-key", source))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count_new, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tree", default=os.path.join(os.path.dirname(__file__), ".."),
+                        help="thư mục gốc repo chứa custom_components/vnnews")
+    args = parser.parse_args()
+
+    sensor, utils = fakes.load_component(args.tree)
+    aiohttp.ClientSession = fakes.FakeSession
+    requests.post = fakes.FakeGemini(base_latency=0, per_token_latency=0).post
+    if hasattr(sensor, "GEMINI_MIN_INTERVAL"):
+        sensor.GEMINI_MIN_INTERVAL = 0
+
+    print(f"{'nguồn':<10} {'poll':<5} {'tin mới':>7} {'đỉnh KiB':>9} {'thời gian':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for source in SOURCES:
+            utils.DB_PATH = os.path.join(tmp, f"{source}.db")
+            utils.init_db()
+            for poll in range(1, MAX_POLLS + 1):
+                count_new, peak, elapsed = measure_poll(sensor, source)
+                print(f"{source:<10} {poll:<5} {count_new:>7} {peak / 1024:>9.0f} {elapsed:>9.2f}s")
+                if count_new == 0:
+                    break
+
+
+if __name__ == "__main__":
+    main()
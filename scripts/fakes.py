@@ -0,0 +1,176 @@
+"""Stand-in cho mạng khi đo hiệu năng: feed RSS, trang bài báo và Gemini giả.
+
+Dùng chung cho các script trong thư mục scripts/, không cần Internet hay API key.
+"""
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+BASE_TIME = datetime(2026, 10, 20, 12, 0, tzinfo=timezone(timedelta(hours=7)))
+ITEMS_PER_FEED = 60
+# Các feed chuyên mục dùng chung một dải id nên có tin trùng giữa các feed
+FEED_ID_STEP = 20
+
+_VOCAB = (
+    "giá xăng tăng mạnh thị trường chứng khoán ngân hàng nhà nước lãi suất doanh nghiệp xuất khẩu "
+    "Hà Nội TP HCM cơ quan chức năng điều tra tai nạn giao thông học sinh giáo viên bệnh viện bác sĩ "
+    "đội tuyển bóng đá trận đấu huấn luyện viên cầu thủ bàn thắng dự án hạ tầng cao tốc"
+).split()
+
+
+def _sentence(rng):
+    words = [rng.choice(_VOCAB) for _ in range(rng.randint(12, 30))]
+    if rng.random() < 0.3:
+        words.insert(3, str(rng.randint(2, 2000)))
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + "."
+
+
+def make_article_text(seed, paragraphs=None):
+    """Nội dung bài báo giả có chú thích ảnh, byline và phần "Liên hệ:" như bài thật."""
+    rng = random.Random(seed)
+    paragraphs = paragraphs or rng.randint(6, 40)
+    body = [" ".join(_sentence(rng) for _ in range(rng.randint(2, 5))) for _ in range(paragraphs)]
+    body.insert(1, "Hiện trường vụ việc sáng nay. Ảnh: Ngọc Thành")
+    body.append("Video: Cận cảnh hiện trường")
+    body.append("Nguyễn Văn Hải")
+    body.append("Liên hệ: 0901 234 567 - Email: ads@example.vn")
+    return body
+
+
+def _outlet(url):
+    return "24h" if "24h.com.vn" in url else "vnexpress"
+
+
+def make_rss(url):
+    outlet = _outlet(url)
+    start = (sum(url.encode()) % 6) * FEED_ID_STEP
+    host = "https://www.24h.com.vn" if outlet == "24h" else "https://vnexpress.net"
+    items = []
+    for article_id in range(start, start + ITEMS_PER_FEED):
+        published = (BASE_TIME - timedelta(minutes=10 * article_id)).strftime("%a, %d %b %Y %H:%M:%S %z")
+        description = (
+            f"<![CDATA[<a href='{host}/tin-{article_id}.html'><img src='{host}/img/{article_id}.jpg'></a>"
+            f"</br>{'Mô tả ngắn của bài viết. ' * 12}]]>"
+        )
+        items.append(
+            f"<item><title><![CDATA[Tin {outlet} số {article_id}: thời sự &amp; kinh tế]]></title>"
+            f"<description>{description}</description><pubDate>{published}</pubDate>"
+            f"<link>{host}/tin-{article_id}.html</link><guid>{host}/tin-{article_id}.html</guid></item>"
+        )
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?><rss version='2.0'><channel>"
+        f"<title>{outlet}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def make_article_html(url):
+    paragraphs = "".join(f'<p class="Normal">{p}</p>' for p in make_article_text(url))
+    # Trang thật có nhiều menu/script; thêm phần đệm để kích thước gần với thực tế
+    padding = "".join(f'<li class="menu-item"><a href="/muc-{i}">Chuyên mục {i}</a></li>' for i in range(800))
+    if _outlet(url) == "24h":
+        article = f'<h1>Tiêu đề</h1><article class="cate-24h-foot-arti-deta-info">{paragraphs}</article>'
+    else:
+        article = f'<h1 class="title-detail">Tiêu đề</h1><article class="fck_detail">{paragraphs}</article>'
+    return f"<html><body><ul>{padding}</ul>{article}</body></html>".encode("utf-8")
+
+
+class _FakeContent:
+    def __init__(self, data):
+        self._data = data
+        self._pos = 0
+
+    async def iter_chunked(self, size):
+        while self._pos < len(self._data):
+            chunk = self._data[self._pos:self._pos + size]
+            self._pos += size
+            yield chunk
+
+    async def read(self):
+        rest = self._data[self._pos:]
+        self._pos = len(self._data)
+        return rest
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.content = _FakeContent(data)
+        self._data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def text(self):
+        return self._data.decode("utf-8")
+
+    async def read(self):
+        return await self.content.read()
+
+
+class FakeSession:
+    """Thay aiohttp.ClientSession: URL .rss trả feed giả, còn lại trả trang bài báo giả."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, url, **kwargs):
+        return FakeResponse(make_rss(url) if url.endswith(".rss") else make_article_html(url))
+
+
+class FakeGeminiResponse:
+    status_code = 200
+
+    def __init__(self, text):
+        self._text = text
+        self.text = json.dumps(self.json(), ensure_ascii=False)
+
+    def json(self):
+        return {"candidates": [{"content": {"parts": [{"text": self._text}]}}]}
+
+
+class FakeGemini:
+    """Thay requests.post cho Gemini: trả 40 từ đầu của nội dung làm bản tóm tắt.
+
+    Độ trễ mô phỏng = base_latency + per_token_latency * số token đầu vào (~3 ký tự
+    một token), nên lượng nội dung gửi đi ảnh hưởng trực tiếp tới thời gian chờ.
+    """
+
+    def __init__(self, base_latency=0.3, per_token_latency=0.00025):
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.calls = 0
+        self.input_tokens = 0
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        prompt = json["contents"][0]["parts"][0]["text"]
+        tokens = math.ceil(len(prompt) / 3)
+        self.calls += 1
+        self.input_tokens += tokens
+        delay = self.base_latency + self.per_token_latency * tokens
+        if delay > 0:
+            time.sleep(delay)
+        content = prompt.split("\n\n", 1)[-1]
+        return FakeGeminiResponse(" ".join(content.split()[:40]))
+
+
+def load_component(tree):
+    """Nạp custom_components.vnnews từ thư mục gốc repo `tree`."""
+    sys.path.insert(0, os.path.abspath(tree))
+    # Nạp core và sensor trước như khi HA chạy, tránh vòng import của http/websocket_api
+    import homeassistant.core  # noqa: F401
+    import homeassistant.components.sensor  # noqa: F401
+    from custom_components.vnnews import sensor, utils
+    return sensor, utils